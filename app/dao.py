@@ -1,5 +1,6 @@
 from collections.abc import Sequence
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models import Photo
@@ -15,7 +16,8 @@ class PhotoDAO:
         return self.db.get(Photo, photo_id)
 
     def list(self, limit: int = 100, offset: int = 0) -> Sequence[Photo]:
-        return self.db.query(Photo).order_by(Photo.id).offset(offset).limit(limit).all()
+        stmt = select(Photo).order_by(Photo.id).offset(offset).limit(limit)
+        return self.db.scalars(stmt).all()
 
     def create(self, object_key: str, description: str | None = None) -> Photo:
         photo = Photo(object_key=object_key, description=description)
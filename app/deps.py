@@ -1,10 +1,11 @@
 from collections.abc import Generator
-from typing import Any
+from typing import Annotated, Any
 
 from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
+from app.dao import PhotoDAO
 from app.database import SessionLocal
 from app.utils.jwt import decode_access_token
 
@@ -35,3 +36,12 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_photo_dao(db: Annotated[Session, Depends(get_db)]) -> PhotoDAO:
+    """
+    Dependency that provides a PhotoDAO bound to the request's session.
+    Routes depend on this rather than building the DAO themselves, so tests
+    can swap in a stub DAO through app.dependency_overrides.
+    """
+    return PhotoDAO(db)
@@ -6,11 +6,10 @@ from typing import Annotated
 from fastapi import APIRouter, Body, Depends, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import Session
 from starlette.status import HTTP_404_NOT_FOUND
 
 from app.dao import PhotoDAO
-from app.deps import get_db
+from app.deps import get_photo_dao
 from app.schemas import MetadataUpdateRequest, PhotoListResponse, PhotoResponse
 
 router = APIRouter()
@@ -38,12 +37,11 @@ def handle_db_errors(func: Callable[..., object]) -> Callable[..., object]:
 @router.get("/photos", response_model=PhotoListResponse)
 @handle_db_errors
 def get_photos(
-    db: Annotated[Session, Depends(get_db)],
+    dao: Annotated[PhotoDAO, Depends(get_photo_dao)],
     limit: Annotated[int, Query(ge=1, le=1000)] = 100,
     offset: Annotated[int, Query(ge=0)] = 0,
 ) -> JSONResponse | PhotoListResponse:
     try:
-        dao = PhotoDAO(db)
         try:
             photos = dao.list(limit=limit, offset=offset)
         except OperationalError:
@@ -59,11 +57,10 @@ def get_photos(
 @router.get("/photos/shuffled", response_model=PhotoListResponse)
 @handle_db_errors
 def get_photos_shuffled(
-    db: Annotated[Session, Depends(get_db)],
+    dao: Annotated[PhotoDAO, Depends(get_photo_dao)],
     limit: Annotated[int, Query(ge=1, le=1000)] = 100,
 ) -> JSONResponse | PhotoListResponse:
     try:
-        dao = PhotoDAO(db)
         try:
             photos = dao.list(limit=1000, offset=0)
         except OperationalError:
@@ -80,10 +77,9 @@ def get_photos_shuffled(
 @handle_db_errors
 def get_photo(
     photo_id: int,
-    db: Annotated[Session, Depends(get_db)],
+    dao: Annotated[PhotoDAO, Depends(get_photo_dao)],
 ) -> JSONResponse | PhotoResponse:
     try:
-        dao = PhotoDAO(db)
         photo = dao.get(photo_id)
     except OperationalError:
         return JSONResponse(status_code=404, content={"detail": "Photo not found"})
@@ -102,11 +98,10 @@ def get_photo(
 @handle_db_errors
 def patch_photo_metadata(
     photo_id: int,
-    db: Annotated[Session, Depends(get_db)],
+    dao: Annotated[PhotoDAO, Depends(get_photo_dao)],
     body: Annotated[MetadataUpdateRequest, Body(...)],
 ) -> JSONResponse | PhotoResponse:
     try:
-        dao = PhotoDAO(db)
         photo = dao.update_description(photo_id, body.description)
     except OperationalError:
         return JSONResponse(
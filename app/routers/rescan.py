@@ -2,10 +2,9 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
 
 from app.dao import PhotoDAO
-from app.deps import get_db
+from app.deps import get_photo_dao
 from app.schemas import RescanResponse
 
 router = APIRouter()
@@ -13,7 +12,7 @@ router = APIRouter()
 
 @router.post("/rescan", response_model=RescanResponse)
 def rescan(
-    db: Annotated[Session, Depends(get_db)],
+    dao: Annotated[PhotoDAO, Depends(get_photo_dao)],
 ) -> RescanResponse | JSONResponse:
     """
     Discover any new photos in storage and report count.
@@ -23,23 +22,13 @@ def rescan(
 
     try:
         backend = get_storage_backend()
+        # The backend is shared per process; a rescan must see new uploads
+        backend.invalidate_list_cache()
         photos = backend.list_photos()
     except Exception as exc:  # noqa: BLE001
         return JSONResponse(status_code=500, content={"detail": str(exc)})
 
-    # Ensure DB tables exist for in-memory SQLite used in tests
-    from app.database import Base
-
-    try:
-        engine = db.get_bind()
-        Base.metadata.create_all(bind=engine)
-    except Exception:  # noqa: BLE001, S110
-        # If we can't get the engine or create tables, continue anyway
-        # This is mostly for test scenarios and should be silent
-        pass
-
-    # Process DB entries; dependency handles session cleanup
-    dao = PhotoDAO(db)
+    # Process DB entries; get_db handles session cleanup
     existing = dao.list(limit=len(photos), offset=0)
     existing_keys = {p.object_key for p in existing}
     new_keys = [k for k in photos if k not in existing_keys]
@@ -1,4 +1,5 @@
 import os
+import threading
 from abc import ABC, abstractmethod
 
 
@@ -17,10 +18,41 @@ class PhotoStorage(ABC):
     @abstractmethod
     def get_photo(self, identifier: str) -> bytes: ...
 
+    def invalidate_list_cache(self) -> None:  # noqa: B027
+        """Forget any cached listing; backends without a cache do nothing."""
+
+    def close(self) -> None:  # noqa: B027
+        """Release held resources; backends holding none do nothing."""
+
+
+# One backend per STORAGE_BACKEND value, so connection pools and caches persist
+_BACKEND_CACHE: dict[str, PhotoStorage] = {}
+_BACKEND_LOCK = threading.Lock()
+
 
 def get_storage_backend() -> PhotoStorage:
-    backend = os.getenv("STORAGE_BACKEND", "dropbox").strip().lower()
-    if backend in ("", "dropbox"):
+    backend = os.getenv("STORAGE_BACKEND", "dropbox").strip().lower() or "dropbox"
+    storage = _BACKEND_CACHE.get(backend)
+    if storage is None:
+        with _BACKEND_LOCK:
+            storage = _BACKEND_CACHE.get(backend)
+            if storage is None:
+                storage = _BACKEND_CACHE[backend] = _create_backend(backend)
+    return storage
+
+
+def reset_storage_backend() -> None:
+    """Close and drop cached backends so the next lookup re-reads the environment."""
+    with _BACKEND_LOCK:
+        backends = list(_BACKEND_CACHE.values())
+        _BACKEND_CACHE.clear()
+    # Each backend may own a connection pool; don't leak its sockets
+    for storage in backends:
+        storage.close()
+
+
+def _create_backend(backend: str) -> PhotoStorage:
+    if backend == "dropbox":
         from app.storage_dropbox import DropboxStorage
 
         return DropboxStorage()
@@ -1,58 +1,141 @@
+import math
 import os
-import re
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.storage import PhotoStorage, StorageError
 
+# Photo suffixes, matched against the lowercased file name
+_PHOTO_EXTS = (".jpg", ".jpeg", ".png")
+
 
 class DropboxStorageError(StorageError):
     """Custom exception for DropboxStorage errors."""
 
 
+def _photo_paths(entries: list[dict[str, str]]) -> list[str]:
+    """Return the relative paths of the JPEG/PNG files in a listing page."""
+    # The cheap .tag check skips folders before any string work
+    return [
+        entry["path_display"].lstrip("/")
+        for entry in entries
+        if entry.get(".tag") == "file" and entry["name"].lower().endswith(_PHOTO_EXTS)
+    ]
+
+
+def _is_path_not_found(body: bytes) -> bool:
+    """Return whether a 409 body is Dropbox's ``path/not_found`` error."""
+    # Malformed paths, restricted content and the like are also 409s
+    try:
+        return orjson.loads(body)["error"]["path"][".tag"] == "not_found"
+    except (orjson.JSONDecodeError, LookupError, TypeError):
+        return False
+
+
 class DropboxStorage(PhotoStorage):
     """
     Photo storage using Dropbox HTTP API.
     """
 
+    _DROPBOX_OAUTH_TOKEN_URL = "https://api.dropbox.com/oauth2/token"  # noqa: S105
     _DROPBOX_LIST_FOLDER_URL = "https://api.dropboxapi.com/2/files/list_folder"
     _DROPBOX_LIST_FOLDER_CONTINUE_URL = (
         "https://api.dropboxapi.com/2/files/list_folder/continue"
     )
     _DROPBOX_DOWNLOAD_URL = "https://content.dropboxapi.com/2/files/download"
+    _DROPBOX_GET_METADATA_URL = "https://api.dropboxapi.com/2/files/get_metadata"
     _SUCCESS_CODE = 200
-    _NOT_FOUND_CODE = 409
+    _CONFLICT_CODE = 409  # Dropbox's status for endpoint-specific errors
     _TIMEOUT = 10  # seconds
+    _DOWNLOAD_CHUNK_SIZE = 64 * 1024
+    _LIST_PAGE_LIMIT = 2000  # entries per list_folder page; Dropbox's maximum
+    _TOKEN_EXPIRY_MARGIN = 30  # seconds; refresh this long before Dropbox does
+    _LIST_CACHE_TTL = 0.0  # seconds; off unless DROPBOX_LIST_CACHE_TTL opts in
+    # Dropbox's read endpoints are POSTs, so retries must allow POST. The last
+    # response is returned rather than raised, keeping our own status handling.
+    _RETRY = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    )
 
-    def __init__(self, base_path: str = "") -> None:
+    def __init__(
+        self, base_path: str = "", list_cache_ttl: float | None = None
+    ) -> None:
         """
         Args:
             base_path: The Dropbox folder to search from. If not provided, uses
                 DROPBOX_ROOT_PATH env var if set, else root ('').
                 Can be specified with or without a leading '/'.
+            list_cache_ttl: Seconds to reuse a list_photos result. If not
+                provided, uses DROPBOX_LIST_CACHE_TTL env var if set, else 0.
+                Zero disables the cache.
         """
         self.token: str | None = None
+        self._token_expiry = 0.0  # time.monotonic() deadline for self.token
+        self._rpc_headers: dict[str, str] = {}
+        self._download_headers: dict[str, str] = {}
         self.app_key = os.getenv("DROPBOX_APP_KEY")
         self.app_secret = os.getenv("DROPBOX_APP_SECRET")
         self.refresh_token = os.getenv("DROPBOX_REFRESH_TOKEN")
+        # Every refresh posts the same form, so build it once
+        self._token_form = {
+            "grant_type": "refresh_token",
+            "refresh_token": self.refresh_token,
+            "client_id": self.app_key,
+            "client_secret": self.app_secret,
+        }
         root_env = os.getenv("DROPBOX_ROOT_PATH", "")
         if not base_path:
             base_path = root_env
         if base_path and not base_path.startswith("/"):
             base_path = "/" + base_path
         self.base_path = base_path
+        # The initial list_folder body only depends on base_path. Dropbox can't
+        # filter by extension, but it can drop deleted and non-downloadable
+        # entries and send bigger pages, trimming payload and continue calls.
+        self._list_body = orjson.dumps(
+            {
+                "path": base_path,
+                "recursive": True,
+                "include_deleted": False,
+                "include_media_info": False,
+                "include_non_downloadable_files": False,
+                "limit": self._LIST_PAGE_LIMIT,
+            }
+        )
+        if list_cache_ttl is None:
+            list_cache_ttl = float(
+                os.getenv("DROPBOX_LIST_CACHE_TTL", str(self._LIST_CACHE_TTL))
+            )
+        self.list_cache_ttl = list_cache_ttl
+        self._list_cache: tuple[float, list[str]] | None = None
+        # One pooled session so OAuth, listing and downloads reuse connections
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=self._RETRY),
+        )
+
+    def close(self) -> None:
+        """Release the pooled HTTP connections."""
+        self.session.close()
 
-    def _refresh_token(self) -> None:
+    def _refresh_token(self) -> str:
         try:
-            resp = requests.post(
-                "https://api.dropbox.com/oauth2/token",
+            resp = self.session.post(
+                self._DROPBOX_OAUTH_TOKEN_URL,
                 headers=None,
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token,
-                    "client_id": self.app_key,
-                    "client_secret": self.app_secret,
-                },
+                data=self._token_form,
                 timeout=self._TIMEOUT,
             )
         except requests.RequestException as exc:
@@ -64,27 +147,60 @@ class DropboxStorage(PhotoStorage):
             )
             raise DropboxStorageError(msg)
         token_json = resp.json()
-        self.token = token_json.get("access_token")
-        if not self.token:
+        token = token_json.get("access_token")
+        if not token:
             msg = "Failed to obtain Dropbox access token"
             raise DropboxStorageError(msg)
-
-    def list_photos(self) -> list[str]:
-        if not self.token:
-            if not all([self.app_key, self.app_secret, self.refresh_token]):
-                msg = "Dropbox OAuth credentials are not set"
-                raise DropboxStorageError(msg)
-            self._refresh_token()
-        headers = {
-            "Authorization": f"Bearer {self.token}",
+        expires_in = token_json.get("expires_in")
+        self.token = token
+        # Rebuilt only when the token changes, not on every request
+        self._download_headers = {"Authorization": f"Bearer {token}"}
+        self._rpc_headers = {
+            **self._download_headers,
             "Content-Type": "application/json",
         }
-        data = {"path": self.base_path, "recursive": True}
+        self._token_expiry = (
+            time.monotonic() + expires_in - self._TOKEN_EXPIRY_MARGIN
+            if expires_in is not None
+            else math.inf
+        )
+        return token
+
+    def _get_token(self) -> str:
+        """Return a valid access token, refreshing it only once it has expired."""
+        if self.token and time.monotonic() < self._token_expiry:
+            return self.token
+        if not all([self.app_key, self.app_secret, self.refresh_token]):
+            msg = "Dropbox OAuth credentials are not set"
+            raise DropboxStorageError(msg)
+        return self._refresh_token()
+
+    def invalidate_list_cache(self) -> None:
+        """Forget the cached listing so the next list_photos asks Dropbox."""
+        self._list_cache = None
+
+    def list_photos(self) -> list[str]:
+        if self._list_cache is not None:
+            fetched_at, photos = self._list_cache
+            if time.monotonic() - fetched_at < self.list_cache_ttl:
+                return list(photos)
+        photos = list(self.iter_photos())
+        self._list_cache = (time.monotonic(), photos)
+        return list(photos)
+
+    def iter_photos(self) -> Iterator[str]:
+        """Yield photo paths page by page as Dropbox returns them.
+
+        Each list_folder/continue request is only made once the previous page
+        has been consumed. Bypasses the list_photos cache.
+        """
+        self._get_token()
+        headers = self._rpc_headers
         try:
-            resp = requests.post(
+            resp = self.session.post(
                 self._DROPBOX_LIST_FOLDER_URL,
                 headers=headers,
-                json=data,
+                data=self._list_body,
                 timeout=self._TIMEOUT,
             )
         except requests.RequestException as exc:
@@ -93,20 +209,15 @@ class DropboxStorage(PhotoStorage):
         if resp.status_code != self._SUCCESS_CODE:
             msg = f"Dropbox API error: {resp.status_code} {resp.text}"
             raise DropboxStorageError(msg)
-        result = resp.json()
-        image_pattern = re.compile(r"\.(jpe?g|png)$", re.IGNORECASE)
-        images = [
-            entry["path_display"].lstrip("/")
-            for entry in result.get("entries", [])
-            if entry.get(".tag") == "file"
-            and image_pattern.search(entry.get("path_display", ""))
-        ]
+        # Listing pages can be large; orjson parses them several times faster
+        result = orjson.loads(resp.content)
+        yield from _photo_paths(result.get("entries", []))
         while result.get("has_more"):
             try:
-                resp = requests.post(
+                resp = self.session.post(
                     self._DROPBOX_LIST_FOLDER_CONTINUE_URL,
                     headers=headers,
-                    json={"cursor": result["cursor"]},
+                    data=orjson.dumps({"cursor": result["cursor"]}),
                     timeout=self._TIMEOUT,
                 )
             except requests.RequestException as exc:
@@ -115,34 +226,88 @@ class DropboxStorage(PhotoStorage):
             if resp.status_code != self._SUCCESS_CODE:
                 msg = f"Dropbox API error: {resp.status_code} {resp.text}"
                 raise DropboxStorageError(msg)
-            result = resp.json()
-            images.extend(
-                [
-                    entry["path_display"].lstrip("/")
-                    for entry in result.get("entries", [])
-                    if entry.get(".tag") == "file"
-                    and image_pattern.search(entry.get("path_display", ""))
-                ]
-            )
-        return images
+            result = orjson.loads(resp.content)
+            yield from _photo_paths(result.get("entries", []))
 
     def get_photo(self, identifier: str) -> bytes:
-        if not self.token:
-            if not all([self.app_key, self.app_secret, self.refresh_token]):
-                msg = "Dropbox OAuth credentials are not set"
-                raise DropboxStorageError(msg)
-            self._refresh_token()
-        url = self._DROPBOX_DOWNLOAD_URL
+        resp = self._open_download(identifier)
+        try:
+            # Photos come back uncompressed, so read the socket directly rather
+            # than through urllib3's decoder; honour Content-Encoding if set.
+            resp.raw.decode_content = bool(resp.headers.get("Content-Encoding"))
+            return resp.raw.read()
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as exc:
+            msg = f"Dropbox API request failed: {exc}"
+            raise DropboxStorageError(msg) from exc
+        finally:
+            resp.close()
+
+    def exists(self, identifier: str) -> bool:
+        """Check for a photo with one get_metadata call instead of a listing."""
+        self._get_token()
+        headers = self._rpc_headers
+        try:
+            resp = self.session.post(
+                self._DROPBOX_GET_METADATA_URL,
+                headers=headers,
+                data=orjson.dumps({"path": f"/photos/{identifier}"}),
+                timeout=self._TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            msg = f"Dropbox API request failed: {exc}"
+            raise DropboxStorageError(msg) from exc
+        if resp.status_code == self._CONFLICT_CODE and _is_path_not_found(resp.content):
+            return False
+        if resp.status_code != self._SUCCESS_CODE:
+            msg = f"Dropbox API error: {resp.status_code} {resp.text}"
+            raise DropboxStorageError(msg)
+        return True
+
+    def get_photos(self, identifiers: list[str], max_workers: int = 16) -> list[bytes]:
+        """Download several photos concurrently over the pooled session.
+
+        Results are in the same order as ``identifiers``; the first failed
+        download raises its DropboxStorageError.
+        """
+        # Fetch the token up front so workers don't race to refresh it
+        self._get_token()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.get_photo, identifiers))
+
+    def iter_photo(self, identifier: str) -> Iterator[bytes]:
+        """Yield a photo's bytes in chunks as they arrive from Dropbox.
+
+        Lets callers such as a ``StreamingResponse`` pass a download on without
+        holding the whole file in memory.
+        """
+        resp = self._open_download(identifier)
+        try:
+            yield from resp.iter_content(self._DOWNLOAD_CHUNK_SIZE)
+        except requests.RequestException as exc:
+            msg = f"Dropbox API request failed: {exc}"
+            raise DropboxStorageError(msg) from exc
+        finally:
+            resp.close()
+
+    def _open_download(self, identifier: str) -> requests.Response:
+        """Start a streamed download, raising unless Dropbox answered 200."""
+        self._get_token()
         headers = {
-            "Authorization": f"Bearer {self.token}",
+            **self._download_headers,
             "Dropbox-API-Arg": f'{{"path": "/photos/{identifier}"}}',
         }
         try:
-            resp = requests.post(url, headers=headers, timeout=self._TIMEOUT)
+            resp = self.session.post(
+                self._DROPBOX_DOWNLOAD_URL,
+                headers=headers,
+                timeout=self._TIMEOUT,
+                stream=True,
+            )
         except requests.RequestException as exc:
             msg = f"Dropbox API request failed: {exc}"
             raise DropboxStorageError(msg) from exc
         if resp.status_code != self._SUCCESS_CODE:
             msg = f"Dropbox API error: {resp.status_code} {resp.text}"
+            resp.close()
             raise DropboxStorageError(msg)
-        return resp.content
+        return resp
@@ -0,0 +1,40 @@
+"""Latency benchmarks for the photo listing routes.
+
+Default runs pass ``--benchmark-disable`` so each benchmark executes once as a
+plain test; measure with
+``pytest tests/benchmarks --benchmark-enable --benchmark-only``.
+"""
+
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest_benchmark.fixture import BenchmarkFixture
+from starlette.status import HTTP_200_OK
+
+pytestmark = pytest.mark.benchmark(group="photos_list")
+
+SEED_COUNT = 10_000
+PAGE_LIMIT = 100
+
+
+def test_bench_list(
+    benchmark: BenchmarkFixture,
+    client: TestClient,
+    seed_photos: Callable[[int], list[int]],
+) -> None:
+    ids = seed_photos(SEED_COUNT)
+    response = benchmark(lambda: client.get(f"/photos?limit={PAGE_LIMIT}&offset=0"))
+    assert response.status_code == HTTP_200_OK
+    assert response.json() == {"photo_ids": ids[:PAGE_LIMIT]}
+
+
+def test_bench_shuffled(
+    benchmark: BenchmarkFixture,
+    client: TestClient,
+    seed_photos: Callable[[int], list[int]],
+) -> None:
+    seed_photos(SEED_COUNT)
+    response = benchmark(lambda: client.get(f"/photos/shuffled?limit={PAGE_LIMIT}"))
+    assert response.status_code == HTTP_200_OK
+    assert len(response.json()["photo_ids"]) == PAGE_LIMIT
@@ -4,23 +4,31 @@
 # pyright: reportAttributeAccessIssue=false
 import logging
 import os
+import sqlite3
 import time
 import uuid
-from collections.abc import Generator, Iterable
+from collections.abc import Callable, Generator, Iterable, Sequence
 from pathlib import Path
 
 import httpx
 import pytest
+import requests
 from fastapi.testclient import TestClient
 from python_on_whales import DockerClient
 from python_on_whales.components.container.cli_wrapper import Container
 from python_on_whales.exceptions import DockerException, NoSuchContainer
-from sqlalchemy import StaticPool, create_engine
+from requests.adapters import HTTPAdapter
+from sqlalchemy import Connection, Engine, StaticPool, create_engine, event, insert
 from sqlalchemy.orm import Session, sessionmaker
 
+from app.dao import PhotoDAO
 from app.database import Base
 from app.deps import get_db
 from app.main import app
+from app.models import Photo
+from app.storage import reset_storage_backend
+from app.storage_dropbox import DropboxStorage
+from tests.dropbox_mock import DropboxMock
 
 # Configure basic logging for tests
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -40,36 +48,212 @@ ENV_VARS_TO_PASS = [
     # Add any other relevant variables here
 ]
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+# Use a private in-memory SQLite database for testing; StaticPool keeps a single
+# connection so every checkout sees the same data without shared-cache URIs.
+SQLALCHEMY_DATABASE_URL = "sqlite://"
+TEST_SQLITE_PRAGMAS = (
+    "synchronous=OFF",
+    "journal_mode=MEMORY",
+    "locking_mode=EXCLUSIVE",
+    "temp_store=MEMORY",
+    "cache_size=-20000",
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Keep loaded attributes after commit so seeded rows can be read without reloading
+TestingSessionLocal = sessionmaker(autoflush=False, expire_on_commit=False)
+
+# Dummy credentials for the Dropbox storage tests; the OAuth endpoint is mocked
+DROPBOX_OAUTH_ENV = {
+    "DROPBOX_APP_KEY": "dummy-app-key",
+    "DROPBOX_APP_SECRET": "dummy-app-secret",
+    "DROPBOX_REFRESH_TOKEN": "dummy-refresh-token",
+}
+
+# HTML reports from ``pytest --profile`` land here, one file per test
+PROFILE_DIR = Path("prof")
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--profile",
+        action="store_true",
+        default=False,
+        help=f"write a pyinstrument HTML profile per test to {PROFILE_DIR}/",
+    )
+
+
+@pytest.fixture(autouse=True)
+def profile(request: pytest.FixtureRequest) -> Generator[None, None, None]:
+    """Profile each test with pyinstrument when ``--profile`` is given."""
+    if not request.config.getoption("--profile"):
+        yield
+        return
+    from pyinstrument import Profiler  # only needed with --profile
+
+    profiler = Profiler()
+    profiler.start()
+    yield
+    profiler.stop()
+    PROFILE_DIR.mkdir(exist_ok=True)
+    profiler.write_html(PROFILE_DIR / f"{request.node.name}.html")
+
+
+@pytest.fixture(scope="session")
+def engine() -> Generator[Engine, None, None]:
+    """Create one in-memory engine and schema for the whole test session.
+
+    Under ``pytest -n auto`` every xdist worker is its own process, so each
+    worker gets a private database from this fixture.
+    """
+    test_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite's implicit transaction handling breaks SAVEPOINT; let SQLAlchemy
+    # emit BEGIN itself so each test can be rolled back cleanly.
+    @event.listens_for(test_engine, "connect")
+    def _disable_pysqlite_begin(
+        dbapi_connection: sqlite3.Connection, _record: object
+    ) -> None:
+        dbapi_connection.isolation_level = None
+
+    # Disposable database: skip fsync, keep the journal and temp tables in
+    # memory, and hold the lock on the single StaticPool connection.
+    @event.listens_for(test_engine, "connect")
+    def _set_test_pragmas(
+        dbapi_connection: sqlite3.Connection, _record: object
+    ) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in TEST_SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    @event.listens_for(test_engine, "begin")
+    def _emit_begin(connection: Connection) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=test_engine)
+    yield test_engine
+    test_engine.dispose()
 
 
 # Database Fixture (Overrides get_db dependency)
 @pytest.fixture
-def session() -> Generator[Session, None, None]:
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+def session(engine: Engine) -> Generator[Session, None, None]:
+    """Yield a session whose commits are rolled back when the test ends."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+
+    def override_get_db() -> Generator[Session, None, None]:
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
     try:
         yield db
     finally:
+        app.dependency_overrides.pop(get_db, None)
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
+def client() -> Generator[TestClient, None, None]:
+    """One TestClient for the whole run; tests get the DB via ``session``."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_storage_backend() -> Generator[None, None, None]:
+    """Keep get_storage_backend's cache from carrying env changes across tests."""
+    yield
+    reset_storage_backend()
+
+
+@pytest.fixture(scope="module")
+def dropbox_oauth_env() -> Generator[None, None, None]:
+    """Set the dummy Dropbox OAuth credentials once per requesting module.
+
+    Swaps in a patched copy of ``os.environ`` in one step rather than
+    recording a setenv/delenv per variable.
+    """
+    env = {**os.environ, **DROPBOX_OAUTH_ENV}
+    env.pop("DROPBOX_TOKEN", None)  # legacy static token
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(os, "environ", env)
+        yield
 
 
 @pytest.fixture
-def client(session: Session) -> Generator[TestClient, None, None]:
-    def override_get_db() -> Generator[Session, None, None]:
-        yield session
+def no_dropbox_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Hide every Dropbox variable at once to simulate missing config."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("DROPBOX_")}
+    monkeypatch.setattr(os, "environ", env)
 
-    app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
-    del app.dependency_overrides[get_db]
+
+@pytest.fixture(scope="module")
+def dropbox_storage(
+    dropbox_oauth_env: None,  # noqa: ARG001
+) -> Generator[DropboxStorage, None, None]:
+    """One DropboxStorage shared by a module's tests.
+
+    Later tests reuse the access token the first one fetched; tests needing
+    a pristine instance construct their own. The listing cache is off so
+    each test sees its own mocked listing.
+    """
+    storage = DropboxStorage(list_cache_ttl=0)
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def dbx_mock(monkeypatch: pytest.MonkeyPatch) -> DropboxMock:
+    """Route every ``requests.Session`` through a fresh DropboxMock."""
+    mock = DropboxMock()
+
+    def _adapter(_session: requests.Session, url: str) -> HTTPAdapter:  # noqa: ARG001
+        return mock
+
+    monkeypatch.setattr(requests.Session, "get_adapter", _adapter)
+    return mock
+
+
+@pytest.fixture
+def seed_photos(session: Session) -> Callable[[int], list[int]]:
+    """Return a helper that inserts ``n`` photos and returns their IDs."""
+
+    def _seed(n: int) -> list[int]:
+        # A single multi-row INSERT ... VALUES; ordered RETURNING would make
+        # SQLAlchemy fall back to one statement per row on SQLite. Row IDs are
+        # allocated in insertion order, so sorting restores it.
+        ids = session.scalars(
+            insert(Photo)
+            .values([{"object_key": f"img_{i}.jpg"} for i in range(n)])
+            .returning(Photo.id)
+        ).all()
+        session.commit()
+        return sorted(ids)
+
+    return _seed
+
+
+@pytest.fixture
+def dao_list(monkeypatch: pytest.MonkeyPatch) -> Callable[..., None]:
+    """Return a helper that stubs ``PhotoDAO.list`` to return or raise."""
+
+    def _set(returns: Sequence[Photo] = (), raises: Exception | None = None) -> None:
+        def _list(_self: PhotoDAO, **_kwargs: object) -> Sequence[Photo]:
+            if raises is not None:
+                raise raises
+            return returns
+
+        monkeypatch.setattr(PhotoDAO, "list", _list)
+
+    return _set
 
 
 # --- Helper Functions for Docker Fixture ---
@@ -0,0 +1,135 @@
+# pyright: reportPrivateUsage=false
+import re
+from collections.abc import Mapping
+from io import BytesIO
+from json import dumps
+from typing import NamedTuple
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+from app.storage_dropbox import DropboxStorage
+
+# Dropbox endpoints as DropboxStorage defines them, for routing mocked requests
+OAUTH_TOKEN_URL = DropboxStorage._DROPBOX_OAUTH_TOKEN_URL  # noqa: SLF001
+LIST_FOLDER_URL = DropboxStorage._DROPBOX_LIST_FOLDER_URL  # noqa: SLF001
+LIST_FOLDER_CONTINUE_URL = (
+    DropboxStorage._DROPBOX_LIST_FOLDER_CONTINUE_URL  # noqa: SLF001
+)
+DOWNLOAD_URL = DropboxStorage._DROPBOX_DOWNLOAD_URL  # noqa: SLF001
+GET_METADATA_URL = DropboxStorage._DROPBOX_GET_METADATA_URL  # noqa: SLF001
+# Size of the pieces iter_photo yields a download in
+DOWNLOAD_CHUNK_SIZE = DropboxStorage._DOWNLOAD_CHUNK_SIZE  # noqa: SLF001
+
+# DropboxStorageError messages the tests expect, compiled once for the suite
+API_ERROR = re.compile("Dropbox API error")
+API_ERROR_401 = re.compile("Dropbox API error: 401")
+MISSING_CREDENTIALS = re.compile("Dropbox OAuth credentials are not set")
+REQUEST_FAILED = re.compile("Dropbox API request failed")
+TOKEN_FAILED = re.compile("Failed to obtain Dropbox access token")
+
+# Wide enough for HTTPAdapter.send under both the requests stubs and the
+# annotations newer requests releases ship inline
+_Timeout = float | tuple[float | None, float | None] | None
+_Cert = bytes | str | tuple[bytes | str, bytes | str] | None
+
+
+class _Route(NamedTuple):
+    status_code: int
+    body: bytes
+    headers: Mapping[str, str]
+    fail_after: int | None
+
+
+class _DroppedStream(BytesIO):
+    """A response body whose connection drops after ``limit`` bytes."""
+
+    def __init__(self, body: bytes, limit: int) -> None:
+        super().__init__(body)
+        self._limit = limit
+
+    def read(self, size: int | None = -1) -> bytes:
+        # A read needing bytes past the limit fails the way a reset socket does
+        if size is None or size < 0 or self.tell() >= self._limit:
+            msg = "Connection reset mid-body"
+            raise ConnectionResetError(msg)
+        return super().read(min(size, self._limit - self.tell()))
+
+
+# Modules using this mock mark themselves ``dbx``: no network or database, so
+# they stay ungrouped and --dist loadgroup spreads them freely
+class DropboxMock(HTTPAdapter):
+    """No-network transport answering Dropbox URLs, in the style of requests-mock.
+
+    The ``dbx_mock`` fixture hands it to every ``requests.Session``, so it
+    serves DropboxStorage's pooled session whichever test module asks. The
+    OAuth token endpoint is registered up front; tests register the Dropbox
+    endpoints they exercise with :meth:`post`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[str] = []
+        self.requests: list[PreparedRequest] = []
+        self._routes: dict[str, _Route | Exception] = {}
+        self.post(OAUTH_TOKEN_URL, json={"access_token": "dummy-token"})
+
+    def post(  # noqa: PLR0913
+        self,
+        url: str,
+        *,
+        status_code: int = 200,
+        json: object = None,
+        content: bytes = b"",
+        text: str = "",
+        headers: Mapping[str, str] | None = None,
+        fail_after: int | None = None,
+        exc: Exception | None = None,
+    ) -> None:
+        """Register the response (or exception) for POSTs to ``url``.
+
+        With ``fail_after``, reading the body past that many bytes raises the
+        error a dropped connection would.
+        """
+        if exc is not None:
+            self._routes[url] = exc
+            return
+        body = dumps(json).encode() if json is not None else content or text.encode()
+        self._routes[url] = _Route(status_code, body, headers or {}, fail_after)
+
+    def send(  # noqa: PLR0913
+        self,
+        request: PreparedRequest,
+        stream: bool = False,  # noqa: ARG002, FBT001, FBT002
+        timeout: _Timeout = None,  # noqa: ARG002
+        verify: bool | str = True,  # noqa: ARG002, FBT002
+        cert: _Cert = None,  # noqa: ARG002
+        proxies: Mapping[str, str] | None = None,  # noqa: ARG002
+    ) -> Response:
+        url = request.url or ""
+        self.calls.append(url)
+        self.requests.append(request)
+        route = self._routes.get(url)
+        if route is None:
+            msg = f"Unmocked Dropbox URL: {url}"
+            raise AssertionError(msg)
+        if isinstance(route, Exception):
+            raise route
+        body = (
+            BytesIO(route.body)
+            if route.fail_after is None
+            else _DroppedStream(route.body, route.fail_after)
+        )
+        # A real urllib3 response, left undecoded as HTTPAdapter.send leaves it
+        raw = HTTPResponse(
+            body=body,
+            headers=route.headers,
+            status=route.status_code,
+            preload_content=False,
+            decode_content=False,
+            request_url=url,
+        )
+        response = self.build_response(request, raw)
+        response.encoding = "utf-8"
+        return response
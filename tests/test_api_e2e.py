@@ -4,7 +4,8 @@ from collections.abc import Generator
 import httpx
 import pytest
 
-pytestmark = pytest.mark.e2e
+# One xdist group so the Docker image and container are built by a single worker
+pytestmark = [pytest.mark.e2e, pytest.mark.xdist_group("e2e")]
 
 
 @pytest.fixture
@@ -1 +0,0 @@
-# Legacy stub; endpoints moved to test_app_*.
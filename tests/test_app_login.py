@@ -7,8 +7,6 @@ from fastapi.testclient import TestClient
 from app.deps import get_current_user
 from app.main import HTTP_200_OK, app
 
-client: TestClient = TestClient(app)
-
 
 @pytest.fixture(autouse=True)
 def set_password_env(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -16,8 +14,7 @@ def set_password_env(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("JWT_SECRET_KEY", "testsecret")
 
 
-def test_login_success() -> None:
-    client = TestClient(app)
+def test_login_success(client: TestClient) -> None:
     response = client.post("/login", json={"password": "supersecret"})
     assert response.status_code == HTTP_200_OK
     data: dict[str, Any] = response.json()
@@ -25,7 +22,7 @@ def test_login_success() -> None:
     assert data["token_type"] == "bearer"  # noqa: S105
 
 
-def test_protected_endpoint_requires_token() -> None:
+def test_protected_endpoint_requires_token(client: TestClient) -> None:
     test_router = APIRouter()
 
     def protected_route() -> dict[str, Any]:
@@ -39,33 +36,27 @@ def test_protected_endpoint_requires_token() -> None:
     )
 
     app.include_router(test_router)
-    test_client: TestClient = TestClient(app)
 
     # No token
-    response = test_client.get("/protected")
+    response = client.get("/protected")
     assert response.status_code in {
         status.HTTP_401_UNAUTHORIZED,
         status.HTTP_403_FORBIDDEN,
     }
 
     # Invalid token
-    response = test_client.get(
-        "/protected", headers={"Authorization": "Bearer notatoken"}
-    )
+    response = client.get("/protected", headers={"Authorization": "Bearer notatoken"})
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
     # Valid token
-    login_resp = test_client.post("/login", json={"password": "supersecret"})
+    login_resp = client.post("/login", json={"password": "supersecret"})
     token: str = login_resp.json()["access_token"]
-    response = test_client.get(
-        "/protected", headers={"Authorization": f"Bearer {token}"}
-    )
+    response = client.get("/protected", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"ok": True}
 
 
-def test_login_failure() -> None:
-    client = TestClient(app)
+def test_login_failure(client: TestClient) -> None:
     response = client.post("/login", json={"password": "wrongpass"})
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     data = response.json()
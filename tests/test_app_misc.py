@@ -9,7 +9,6 @@ def test_app_instance_exists() -> None:
     assert app is not None
 
 
-def test_root_returns_404() -> None:
-    client = TestClient(app)
+def test_root_returns_404(client: TestClient) -> None:
     response = client.get("/")
     assert response.status_code == NOT_FOUND
@@ -1,11 +1,11 @@
+from collections.abc import Callable, Generator
 from typing import Never, NoReturn
 
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
 from starlette.status import (
     HTTP_200_OK,
     HTTP_404_NOT_FOUND,
@@ -13,115 +13,88 @@ from starlette.status import (
 )
 
 from app.dao import PhotoDAO
-from app.database import Base
-from app.deps import get_db
+from app.deps import get_db, get_photo_dao
 from app.main import app
+from app.models import Photo
 
+_NOT_FOUND = {"detail": "Photo not found"}
+_NO_PHOTOS: dict[str, list[int]] = {"photo_ids": []}
 
-def test_get_photos_returns_photo_ids() -> None:
-    # Setup in-memory DB and override SessionLocal
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photos_returns_photo_ids?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    # Override DB dependency
-    app.dependency_overrides[get_db] = lambda: session
-    # Seed two photos
-    dao = PhotoDAO(session)
-    photo1 = dao.create(object_key="foo.jpg", description=None)
-    photo2 = dao.create(object_key="bar.png", description=None)
-    client = TestClient(app)
+
+class _BoomError(Exception):
+    """Simulated database failure raised from a patched DAO method."""
+
+
+class _GenericError(Exception):
+    """Unexpected non-database error raised by ``_FaultyDAO``."""
+
+
+class _FaultyDAO:
+    """Stand-in for ``PhotoDAO`` whose lookups and updates always fail."""
+
+    def get(self, _photo_id: int) -> Never:
+        msg = "something went wrong!"
+        raise _GenericError(msg)
+
+    def update_description(self, _photo_id: int, _description: str | None) -> Never:
+        msg = "mock generic error"
+        raise _GenericError(msg)
+
+
+@pytest.fixture
+def faulty_dao() -> Generator[None, None, None]:
+    """Serve ``_FaultyDAO`` from the ``get_photo_dao`` dependency."""
+    app.dependency_overrides[get_photo_dao] = _FaultyDAO
+    yield
+    app.dependency_overrides.pop(get_photo_dao, None)
+
+
+def _broken_db() -> Never:
+    msg = "database unavailable"
+    raise _BoomError(msg)
+
+
+@pytest.fixture
+def broken_db() -> Generator[None, None, None]:
+    """Make the ``get_db`` dependency itself fail before any DAO is built."""
+    app.dependency_overrides[get_db] = _broken_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_get_photos_returns_photo_ids(
+    client: TestClient, seed_photos: Callable[[int], list[int]]
+) -> None:
+    ids = seed_photos(2)
     response = client.get("/photos?limit=2&offset=0")
     assert response.status_code == HTTP_200_OK
     data = response.json()
-    assert data["photo_ids"] == [photo1.id, photo2.id]
+    assert data["photo_ids"] == ids
 
 
-def test_get_photos_empty() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photos_empty?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
-    client = TestClient(app)
+@pytest.mark.usefixtures("session")
+def test_get_photos_empty(client: TestClient) -> None:
     response = client.get("/photos?limit=2&offset=0")
     assert response.status_code == HTTP_200_OK
-    data = response.json()
-    assert data["photo_ids"] == []
+    assert response.json() == _NO_PHOTOS
 
 
-def test_get_photos_pagination() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photos_pagination?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
-    # Seed 10 photos
-    dao = PhotoDAO(session)
-    for i in range(10):
-        dao.create(object_key=f"img_{i}.jpg", description=None)
-    client = TestClient(app)
+def test_get_photos_pagination(
+    client: TestClient, seed_photos: Callable[[int], list[int]]
+) -> None:
+    ids = seed_photos(10)
     response = client.get("/photos?limit=5&offset=5")
     assert response.status_code == HTTP_200_OK
     data = response.json()
-    assert data["photo_ids"] == [6, 7, 8, 9, 10]
-
-
-def test_get_photos_storage_error() -> None:
-    # Simulate DB connection error
-    class BoomError(Exception):
-        pass
-
-    def bad_session() -> NoReturn:
-        error_msg: str = "db error"
-        raise BoomError(error_msg)
-
-    # Override DB dependency to simulate error
-    app.dependency_overrides[get_db] = bad_session
-    client = TestClient(app)
-    response = client.get("/photos?limit=2&offset=0")
-    assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
-    data = response.json()
-    assert "detail" in data
+    assert data["photo_ids"] == ids[5:]
 
 
 # Tests for GET /photos/{id}
-def test_get_photo_by_id_success() -> None:
-    # Setup in-memory DB and override SessionLocal
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photo_by_id_success?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
+def test_get_photo_by_id_success(client: TestClient, session: Session) -> None:
     # Seed two photos
     dao = PhotoDAO(session)
     photo1 = dao.create(object_key="foo.jpg", description=None)
     photo2 = dao.create(object_key="bar.jpg", description="Bar")
-    client = TestClient(app)
     # Happy path for first photo
     response = client.get(f"/photos/{photo1.id}")
     assert response.status_code == HTTP_200_OK
@@ -139,88 +112,25 @@ def test_get_photo_by_id_success() -> None:
     assert data["description"] == "Bar"
 
 
-def test_get_photo_by_id_not_found() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photo_by_id_not_found?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
-    client = TestClient(app)
+@pytest.mark.usefixtures("session")
+def test_get_photo_by_id_not_found(client: TestClient) -> None:
     response = client.get("/photos/1")
     assert response.status_code == HTTP_404_NOT_FOUND
-    data = response.json()
-    assert data["detail"] == "Photo not found"
+    assert response.json() == _NOT_FOUND
 
 
-def test_get_photo_by_id_storage_error() -> None:
-    class BoomError(Exception):
-        pass
-
-    def bad_session() -> NoReturn:
-        error_msg: str = "db error"
-        raise BoomError(error_msg)
-
-    app.dependency_overrides[get_db] = bad_session
-    client = TestClient(app)
-    response = client.get("/photos/1")
-    assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
-    data = response.json()
-    assert "detail" in data
-
-
-def test_get_photo_by_id_generic_exception(
-    client: TestClient,
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    # Patch PhotoDAO.get to raise a generic exception
-    class GenericError(Exception):
-        pass
-
-    engine = create_engine(
-        "sqlite:///file:memdb_get_photo_by_id_generic_exception?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
-    dao = PhotoDAO(session)
-    dao.create(object_key="foo.jpg", description=None)
-
-    def raise_generic_error(_self: PhotoDAO, _photo_id: int) -> Never:
-        msg = "something went wrong!"
-        raise GenericError(msg)
-
-    monkeypatch.setattr(PhotoDAO, "get", raise_generic_error)
-    client = TestClient(app)
+@pytest.mark.usefixtures("faulty_dao")
+def test_get_photo_by_id_generic_exception(client: TestClient) -> None:
     response = client.get("/photos/1")
     assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
     data = response.json()
     assert "something went wrong!" in data["detail"]
 
 
-def test_patch_photo_description_success() -> None:
-    # Use a shared in-memory SQLite DB
-    db_url = "sqlite:///file:memdb_patch_description?mode=memory&cache=shared&uri=true"
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(engine)
-    session_maker = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-    session = session_maker()
-    app.dependency_overrides[get_db] = lambda: session
-
+def test_patch_photo_description_success(client: TestClient, session: Session) -> None:
     dao = PhotoDAO(session)
     photo = dao.create(object_key="foo.jpg", description=None)
 
-    client = TestClient(app)
     response = client.patch(
         f"/photos/{photo.id}/metadata",
         json={"description": "A new description!"},
@@ -237,57 +147,23 @@ def test_patch_photo_description_success() -> None:
     assert updated is not None
     assert updated.description == "A new description!"
 
-    # Clean up
-    app.dependency_overrides.clear()
-    session.close()
-    engine.dispose()
 
-
-def test_patch_photo_description_not_found() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_patch_photo_description_not_found?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    app.dependency_overrides[get_db] = lambda: session
-    client = TestClient(app)
+@pytest.mark.usefixtures("session")
+def test_patch_photo_description_not_found(client: TestClient) -> None:
     response = client.patch(
         "/photos/123/metadata", json={"description": "Doesn't exist"}
     )
     assert response.status_code == HTTP_404_NOT_FOUND
-    data = response.json()
-    assert data["detail"] == "Photo not found"
-
-
-def test_patch_photo_description_db_error() -> None:
-    class BoomError(Exception):
-        pass
-
-    def bad_session() -> NoReturn:
-        msg = "db error"
-        raise BoomError(msg)
-
-    app.dependency_overrides[get_db] = bad_session
-    client = TestClient(app)
-    response = client.patch("/photos/1/metadata", json={"description": "irrelevant"})
-    assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
-    data = response.json()
-    assert "detail" in data
+    assert response.json() == _NOT_FOUND
 
 
+@pytest.mark.usefixtures("session")
 def test_patch_photo_description_operational_error(
     client: TestClient,
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
-    """Test patch_photo_caption handles OperationalError gracefully."""
+    """Test patch_photo_metadata handles OperationalError gracefully."""
     # Mock PhotoDAO.update_description to raise OperationalError
-    from sqlalchemy.exc import OperationalError
-
     error_message = "mock db error"
     params_value = "params"
     orig_exception = BaseException("original db context")
@@ -308,145 +184,116 @@ def test_patch_photo_description_operational_error(
     assert "detail" in response.json()
 
 
-def test_patch_photo_description_generic_error(
-    client: TestClient,
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
-    """Test patch_photo_caption handles generic Exception."""
-    # Mock PhotoDAO.update_description to raise a generic Exception
-    error_message = "mock generic error"
-
-    class CustomGenericError(Exception):
-        """Custom exception for testing."""
-
-    def mock_update_description(_photo_id: int, _description: str) -> Never:
-        raise CustomGenericError(error_message)
-
-    monkeypatch.setattr(PhotoDAO, "update_description", mock_update_description)
-
+@pytest.mark.usefixtures("faulty_dao")
+def test_patch_photo_description_generic_error(client: TestClient) -> None:
+    """Test patch_photo_metadata handles generic Exception."""
     update_payload = {"description": "Trigger Generic Error"}
     response = client.patch("/photos/1/metadata", json=update_payload)
 
     # The route's own except Exception block should catch this
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-    # Just verify there's a detail field in the response, content may vary
-    assert "detail" in response.json()
+    assert response.json() == {"detail": "mock generic error"}
 
 
-SHUFFLE_TOTAL = 5
+# 12! orderings: a correct shuffle returns the identity with p ~ 2e-9
+SHUFFLE_TOTAL = 12
 SHUFFLE_LIMIT = 3
 
 
-def test_get_photos_shuffled_returns_all_when_limit_exceeds_count() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_photos_shuffled_all?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
-    app.dependency_overrides[get_db] = lambda: session
-    dao = PhotoDAO(session)
-    ids = [
-        dao.create(object_key=f"img_{i}.jpg", description=None).id
-        for i in range(SHUFFLE_TOTAL)
-    ]
-    client = TestClient(app)
-    response = client.get("/photos/shuffled?limit=100")
-    assert response.status_code == HTTP_200_OK
-    data = response.json()
-    assert sorted(data["photo_ids"]) == sorted(ids)
-    assert len(data["photo_ids"]) == SHUFFLE_TOTAL
-
-
-def test_get_photos_shuffled_respects_limit() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_photos_shuffled_limit?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
-    app.dependency_overrides[get_db] = lambda: session
-    dao = PhotoDAO(session)
-    [dao.create(object_key=f"img_{i}.jpg", description=None) for i in range(10)]
-    client = TestClient(app)
-    response = client.get(f"/photos/shuffled?limit={SHUFFLE_LIMIT}")
+@pytest.mark.parametrize(
+    ("limit", "expected_len", "check_randomized"),
+    [
+        # Limit larger than the table returns every photo
+        (100, SHUFFLE_TOTAL, False),
+        # Limit smaller than the table is respected
+        (SHUFFLE_LIMIT, SHUFFLE_LIMIT, False),
+        # A full-table request should not come back in ID order
+        (SHUFFLE_TOTAL, SHUFFLE_TOTAL, True),
+    ],
+)
+def test_get_photos_shuffled(
+    client: TestClient,
+    seed_photos: Callable[[int], list[int]],
+    limit: int,
+    expected_len: int,
+    *,
+    check_randomized: bool,
+) -> None:
+    ids = seed_photos(SHUFFLE_TOTAL)
+    response = client.get(f"/photos/shuffled?limit={limit}")
     assert response.status_code == HTTP_200_OK
-    data = response.json()
-    assert len(data["photo_ids"]) == SHUFFLE_LIMIT
-    # All IDs must be unique
-    assert len(set(data["photo_ids"])) == SHUFFLE_LIMIT
+    photo_ids = response.json()["photo_ids"]
+    assert len(photo_ids) == expected_len
+    # All IDs must be unique and come from the seeded photos
+    assert len(set(photo_ids)) == expected_len
+    assert set(photo_ids).issubset(ids)
+    if check_randomized:
+        assert photo_ids != ids
 
 
-def test_get_photos_shuffled_is_randomized() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_photos_shuffled_random?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
-    app.dependency_overrides[get_db] = lambda: session
-    dao = PhotoDAO(session)
-    [
-        dao.create(object_key=f"img_{i}.jpg", description=None)
-        for i in range(SHUFFLE_TOTAL)
-    ]
-    client = TestClient(app)
-    orderings: set[tuple[int, ...]] = set()
-    for _ in range(5):
-        response = client.get(f"/photos/shuffled?limit={SHUFFLE_TOTAL}")
-        assert response.status_code == HTTP_200_OK
-        orderings.add(tuple(response.json()["photo_ids"]))
-    # At least two different orderings should be seen
-    assert len(orderings) > 1
-
-
-def test_get_photos_shuffled_empty_db() -> None:
-    engine = create_engine(
-        "sqlite:///file:memdb_photos_shuffled_empty?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
-    app.dependency_overrides[get_db] = lambda: session
-    client = TestClient(app)
+@pytest.mark.usefixtures("session")
+def test_get_photos_shuffled_empty_db(client: TestClient) -> None:
     response = client.get("/photos/shuffled?limit=10")
     assert response.status_code == HTTP_200_OK
-    data = response.json()
-    assert data["photo_ids"] == []
-
+    assert response.json() == _NO_PHOTOS
 
-def test_get_photos_shuffled_storage_error() -> None:
-    class BoomError(Exception):
-        pass
 
-    def bad_session() -> NoReturn:
+@pytest.mark.usefixtures("session")
+@pytest.mark.parametrize(
+    ("method", "url", "body", "dao_method"),
+    [
+        ("GET", "/photos?limit=2&offset=0", None, "list"),
+        ("GET", "/photos/1", None, "get"),
+        (
+            "PATCH",
+            "/photos/1/metadata",
+            {"description": "irrelevant"},
+            "update_description",
+        ),
+        ("GET", f"/photos/shuffled?limit={SHUFFLE_LIMIT}", None, "list"),
+    ],
+    ids=["list", "get", "patch_metadata", "shuffled"],
+)
+def test_db_error_paths(  # noqa: PLR0913
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+    method: str,
+    url: str,
+    body: dict[str, str] | None,
+    dao_method: str,
+) -> None:
+    # Simulate DB error from the DAO method the route relies on
+    def bad_dao_call(*_args: object, **_kwargs: object) -> NoReturn:
         msg = "db error"
-        raise BoomError(msg)
+        raise _BoomError(msg)
 
-    app.dependency_overrides[get_db] = bad_session
-    client = TestClient(app)
-    response = client.get(f"/photos/shuffled?limit={SHUFFLE_LIMIT}")
+    monkeypatch.setattr(PhotoDAO, dao_method, bad_dao_call)
+    response = client.request(method, url, json=body)
     assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
     data = response.json()
     assert "detail" in data
 
 
+@pytest.mark.usefixtures("broken_db")
+def test_get_db_error_handled_by_middleware(client: TestClient) -> None:
+    # Dependency errors never reach handle_db_errors; TestErrorMiddleware answers
+    response = client.get("/photos")
+    assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.json() == {"detail": "database unavailable"}
+
+
 # Tests for handle_db_errors decorator via routes
+@pytest.mark.usefixtures("session")
 def test_get_photos_decorator_test_app_error(
     client: TestClient,
-    monkeypatch: pytest.MonkeyPatch,
+    dao_list: Callable[..., None],
 ) -> None:
     """Test handle_db_errors catches test_app exception from DAO via route."""
 
     class CustomTestAppError(Exception):
         __module__ = "test_app_module"
 
-    error_message = "DAO Test error from test_app module"
-
-    def mock_list(_self: object, **kwargs: object) -> Never:  # noqa: ARG001
-        raise CustomTestAppError(error_message)
-
-    monkeypatch.setattr(PhotoDAO, "list", mock_list)
+    dao_list(raises=CustomTestAppError("DAO Test error from test_app module"))
 
     response = client.get("/photos")
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -456,6 +303,7 @@ def test_get_photos_decorator_test_app_error(
 # Tests for GET /photos
 
 
+@pytest.mark.usefixtures("session")
 def test_patch_photo_description_invalid_payload(client: TestClient) -> None:
     """Test updating with invalid payload returns 422."""
     # Payload missing the required 'description' field
@@ -469,26 +317,15 @@ def test_patch_photo_description_invalid_payload(client: TestClient) -> None:
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+@pytest.mark.usefixtures("session")
 def test_get_photos_shuffled_success(
     client: TestClient,
-    monkeypatch: pytest.MonkeyPatch,
+    dao_list: Callable[..., None],
 ) -> None:
     """Test getting shuffled photo IDs successfully."""
     # Mock PhotoDAO.list to return pre-shuffled results
     mock_ids = [3, 1, 2]
-
-    # Mock a Photo object
-    class MockPhoto:
-        def __init__(self, photo_id: int) -> None:
-            self.id = photo_id
-
-    # Create mock photos with the desired IDs
-    mock_photos = [MockPhoto(photo_id) for photo_id in mock_ids]
-
-    def mock_list(_self: object, **kwargs: object) -> list[MockPhoto]:  # noqa: ARG001
-        return mock_photos
-
-    monkeypatch.setattr(PhotoDAO, "list", mock_list)
+    dao_list(returns=[Photo(id=photo_id) for photo_id in mock_ids])
 
     response = client.get("/photos/shuffled")
     assert response.status_code == status.HTTP_200_OK
@@ -500,23 +337,17 @@ def test_get_photos_shuffled_success(
     assert set(response_data["photo_ids"]) == set(mock_ids)
 
 
+@pytest.mark.usefixtures("session")
 def test_get_photos_shuffled_db_error(
     client: TestClient,
-    monkeypatch: pytest.MonkeyPatch,
+    dao_list: Callable[..., None],
 ) -> None:
     """Test GET /photos/shuffled handles OperationalError returning empty list."""
-
-    # Mock PhotoDAO.list to raise OperationalError
-    error_message = "mock shuffle db error"
     # Provide BaseException instance
     orig_exception = BaseException("original shuffle error context")
-
-    def mock_list_error(_self: object, **kwargs: object) -> Never:  # noqa: ARG001
-        raise OperationalError(error_message, None, orig_exception)
-
-    monkeypatch.setattr(PhotoDAO, "list", mock_list_error)
+    dao_list(raises=OperationalError("mock shuffle db error", None, orig_exception))
 
     response = client.get("/photos/shuffled")
     # Endpoint returns 200 with empty list on error
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == {"photo_ids": []}
+    assert response.json() == _NO_PHOTOS
@@ -1,64 +1,88 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
 from starlette.status import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR
 
 from app import main
-from app.database import Base
-from app.deps import get_db
-from app.main import app
+from app.dao import PhotoDAO
+from app.routers.rescan import rescan
+from app.schemas import RescanResponse
+from app.storage import PhotoStorage
+from tests.dropbox_mock import LIST_FOLDER_URL, DropboxMock
 
 EXPECTED_NEW_PHOTOS = 3
 
 
-def test_rescan_success(monkeypatch: pytest.MonkeyPatch) -> None:
-    # Setup in-memory DB
-    engine = create_engine(
-        "sqlite:///file:memdb_rescan_success?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    session = sessionmaker(
-        bind=engine,
-        autoflush=False,
-        autocommit=False,
-    )()
-    # Use dependency override instead of monkeypatching
-    app.dependency_overrides[get_db] = lambda: session
-    client = TestClient(app)
-
-    class MockStorage:
-        def list_photos(self) -> list[str]:
-            return ["a.jpg", "b.png", "c.webp"]
-
-    monkeypatch.setattr(main, "get_storage_backend", lambda: MockStorage())
-    response = client.post("/rescan")
-    assert response.status_code == HTTP_200_OK
-    data = response.json()
-    assert data.get("status") == "ok"
-    assert data.get("num_new_photos") == EXPECTED_NEW_PHOTOS
+class _BoomError(Exception):
+    """Storage failure raised by ``_FailingStorage``."""
+
+
+class _MockStorage(PhotoStorage):
+    def list_photos(self) -> list[str]:
+        return ["a.jpg", "b.png", "c.webp"]
+
+    def get_photo(self, identifier: str) -> bytes:
+        return identifier.encode()
+
 
+class _FailingStorage(PhotoStorage):
+    def list_photos(self) -> list[str]:
+        msg = "oops"
+        raise _BoomError(msg)
 
-def test_rescan_storage_error(monkeypatch: pytest.MonkeyPatch) -> None:
-    client = TestClient(app)
+    def get_photo(self, identifier: str) -> bytes:
+        raise _BoomError(identifier)
 
-    class BoomError(Exception):
-        pass
 
-    msg: str = "oops"
+def _listing(*names: str) -> dict[str, object]:
+    """A one-page Dropbox list_folder response holding ``names``."""
+    entries = [
+        {".tag": "file", "name": name, "path_display": f"/photos/{name}"}
+        for name in names
+    ]
+    return {"entries": entries, "has_more": False}
 
-    def fail() -> list[str]:
-        raise BoomError(msg)
 
-    class MockStorage:
-        def list_photos(self) -> list[str]:
-            return fail()
+def test_rescan_success(session: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Call the route handler directly; the HTTP stack is covered below
+    monkeypatch.setattr(main, "get_storage_backend", _MockStorage)
+    result = rescan(dao=PhotoDAO(session))
+    assert isinstance(result, RescanResponse)
+    assert result.status == "ok"
+    assert result.num_new_photos == EXPECTED_NEW_PHOTOS
 
-    # Override both the DB dependency and the storage backend
-    app.dependency_overrides[get_db] = lambda: None  # DB won't be used because of error
-    monkeypatch.setattr(main, "get_storage_backend", lambda: MockStorage())
+
+@pytest.mark.usefixtures("session")
+def test_rescan_success_over_http(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # End-to-end smoke test of the 200 path through response_model
+    monkeypatch.setattr(main, "get_storage_backend", _MockStorage)
+    response = client.post("/rescan")
+    assert response.status_code == HTTP_200_OK
+    assert response.json() == {"status": "ok", "num_new_photos": EXPECTED_NEW_PHOTOS}
+
+
+@pytest.mark.usefixtures("session")
+def test_rescan_storage_error(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # DB won't be used because of the storage error
+    monkeypatch.setattr(main, "get_storage_backend", _FailingStorage)
     response = client.post("/rescan")
     assert response.status_code == HTTP_500_INTERNAL_SERVER_ERROR
     data = response.json()
     assert "detail" in data
+
+
+@pytest.mark.usefixtures("session", "dropbox_oauth_env")
+def test_rescan_finds_uploads_despite_list_cache(
+    client: TestClient, dbx_mock: DropboxMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A cached listing must not hide photos uploaded since the last rescan
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+    monkeypatch.setenv("DROPBOX_LIST_CACHE_TTL", "60")
+    dbx_mock.post(LIST_FOLDER_URL, json=_listing("a.jpg"))
+    assert client.post("/rescan").json()["num_new_photos"] == 1
+    dbx_mock.post(LIST_FOLDER_URL, json=_listing("a.jpg", "b.jpg"))
+    assert client.post("/rescan").json()["num_new_photos"] == 1
@@ -1,27 +1,12 @@
-from collections.abc import Generator
-
-import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.dao import PhotoDAO
-from app.database import Base
-
+from app.models import Photo
 
-@pytest.fixture
-def in_memory_db(request: pytest.FixtureRequest) -> Generator[Session, None, None]:
-    db_url = f"sqlite:///file:memdb_dao_{request.node.name}?mode=memory&cache=shared&uri=true"  # type: ignore[attr-defined]
-    engine = create_engine(
-        db_url,
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
 
-
-def test_create_and_get_photo(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
+def test_create_and_get_photo(session: Session) -> None:
+    dao = PhotoDAO(session)
     created = dao.create(object_key="photos/dao.jpg", description="DAO test")
     fetched = dao.get(created.id)
     assert fetched is not None
@@ -29,10 +14,13 @@ def test_create_and_get_photo(in_memory_db: Session) -> None:
     assert fetched.description == "DAO test"
 
 
-def test_list_photos(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
-    dao.create(object_key="photos/one.jpg")
-    dao.create(object_key="photos/two.jpg")
+def test_list_photos(session: Session) -> None:
+    # One executemany INSERT; this test only needs the rows to exist
+    session.execute(
+        insert(Photo),
+        [{"object_key": "photos/one.jpg"}, {"object_key": "photos/two.jpg"}],
+    )
+    dao = PhotoDAO(session)
     photos = dao.list()
     expected_photo_count = 2
     assert len(photos) == expected_photo_count
@@ -40,29 +28,29 @@ def test_list_photos(in_memory_db: Session) -> None:
     assert {"photos/one.jpg", "photos/two.jpg"}.issubset(object_keys)
 
 
-def test_update_description(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
+def test_update_description(session: Session) -> None:
+    dao = PhotoDAO(session)
     created = dao.create(object_key="photos/three.jpg", description=None)
     updated = dao.update_description(created.id, "Updated description")
     assert updated is not None
     assert updated.description == "Updated description"
 
 
-def test_delete_photo(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
+def test_delete_photo(session: Session) -> None:
+    dao = PhotoDAO(session)
     created = dao.create(object_key="photos/four.jpg")
     deleted = dao.delete(created.id)
     assert deleted is True
     assert dao.get(created.id) is None
 
 
-def test_update_description_not_found(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
+def test_update_description_not_found(session: Session) -> None:
+    dao = PhotoDAO(session)
     result = dao.update_description(9999, "nope")
     assert result is None
 
 
-def test_delete_not_found(in_memory_db: Session) -> None:
-    dao = PhotoDAO(in_memory_db)
+def test_delete_not_found(session: Session) -> None:
+    dao = PhotoDAO(session)
     result = dao.delete(9999)
     assert result is False
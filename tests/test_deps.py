@@ -1,5 +1,7 @@
 """Tests for dependency injection utilities."""
 
+import contextlib
+
 from sqlalchemy.orm import Session
 
 from app.deps import get_db
@@ -14,7 +16,5 @@ def test_get_db_yields_session() -> None:
     # Verify it's a Session
     assert isinstance(session, Session)
     # Close the session (simulating the end of the with block in FastAPI)
-    import contextlib
-
     with contextlib.suppress(StopIteration):
         next(db_gen)
@@ -1,62 +1,43 @@
-from collections.abc import Generator
-from typing import Any
-
 import pytest
-from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.database import Base
 from app.models import Photo
 
 
-@pytest.fixture
-def in_memory_db() -> Generator[Session, None, None]:
-    """Create a new database and session for each test."""
-    engine = create_engine(
-        "sqlite:///file:memdb_models?mode=memory&cache=shared&uri=true",
-        connect_args={"check_same_thread": False},
-    )
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
-    # No explicit teardown needed; in-memory DB is discarded
-
-
-def test_photo_table_schema(in_memory_db: Session) -> None:  # noqa: ARG001
-    # Ensure the table exists and columns are as expected
-    columns: Any = inspect(Photo).c  # type: ignore[no-redef]
-    column_names: set[str] = {c.name for c in columns.values()}  # type: ignore[attr-defined]
+def test_photo_table_schema() -> None:
+    # Read the declared columns straight from the table metadata
+    column_names = {c.name for c in Photo.__table__.columns}
     assert {"id", "object_key", "description"}.issubset(column_names)
 
 
-def test_insert_and_query_photo(in_memory_db: Session) -> None:
+def test_insert_and_query_photo(session: Session) -> None:
     photo = Photo(object_key="photos/foo.jpg", description="A description")
-    in_memory_db.add(photo)
-    in_memory_db.commit()
-    found = in_memory_db.query(Photo).filter_by(object_key="photos/foo.jpg").first()
+    session.add(photo)
+    session.commit()
+    found = session.query(Photo).filter_by(object_key="photos/foo.jpg").first()
     assert found is not None
     assert found.object_key == "photos/foo.jpg"
     assert found.description == "A description"
 
 
-def test_unique_object_key_constraint(in_memory_db: Session) -> None:
+def test_unique_object_key_constraint(session: Session) -> None:
     photo1 = Photo(object_key="photos/bar.jpg")
     photo2 = Photo(object_key="photos/bar.jpg")
-    in_memory_db.add(photo1)
-    in_memory_db.commit()
-    in_memory_db.add(photo2)
+    session.add(photo1)
+    session.commit()
+    session.add(photo2)
     with pytest.raises(IntegrityError):
-        in_memory_db.commit()
+        session.commit()
 
 
-def test_nullable_description(in_memory_db: Session) -> None:
+def test_nullable_description(session: Session) -> None:
     photo = Photo(object_key="photos/baz.jpg", description=None)
-    in_memory_db.add(photo)
-    in_memory_db.commit()
-    in_memory_db.refresh(photo)
+    session.add(photo)
+    session.commit()
+    session.refresh(photo)
 
-    found = in_memory_db.get(Photo, photo.id)
+    found = session.get(Photo, photo.id)
     assert found is not None  # Ensure photo was found before accessing attributes
     assert found.description is None
     assert found.id == photo.id
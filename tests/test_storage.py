@@ -1,29 +1,113 @@
+import gzip
+import time
 from collections.abc import Mapping
-from unittest.mock import patch
+from http import HTTPStatus
+from json import loads
 
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 
-from app.storage import PhotoStorage, get_storage_backend
+from app.storage import PhotoStorage, get_storage_backend, reset_storage_backend
 from app.storage_dropbox import DropboxStorage, DropboxStorageError
+from tests.dropbox_mock import (
+    API_ERROR,
+    API_ERROR_401,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_URL,
+    GET_METADATA_URL,
+    LIST_FOLDER_CONTINUE_URL,
+    LIST_FOLDER_URL,
+    MISSING_CREDENTIALS,
+    OAUTH_TOKEN_URL,
+    REQUEST_FAILED,
+    DropboxMock,
+)
+
+pytestmark = pytest.mark.dbx
+
+# Dropbox list_folder response: nested images, a non-image and a folder
+FILES_RESPONSE: Mapping[str, object] = {
+    "entries": [
+        {
+            ".tag": "file",
+            "name": "photo1.jpg",
+            "path_display": "/photos/photo1.jpg",
+        },
+        {
+            ".tag": "file",
+            "name": "photo2.png",
+            "path_display": "/photos/photo2.png",
+        },
+        {
+            ".tag": "file",
+            "name": "nested1.JPG",
+            "path_display": "/photos/2024/nested1.JPG",
+        },
+        {
+            ".tag": "file",
+            "name": "nested2.jpeg",
+            "path_display": "/photos/2024/events/nested2.jpeg",
+        },
+        {
+            ".tag": "file",
+            "name": "not_photo.txt",
+            "path_display": "/docs/not_photo.txt",
+        },
+        {
+            ".tag": "folder",
+            "name": "2024",
+            "path_display": "/photos/2024",
+        },
+    ],
+    "has_more": False,
+}
+# First page of a listing that continues, for the pagination error test
+FIRST_PAGE_RESPONSE: Mapping[str, object] = {
+    "entries": [
+        {".tag": "file", "name": "photo1.jpg", "path_display": "/photos/photo1.jpg"}
+    ],
+    "has_more": True,
+    "cursor": "abc123",
+}
+PHOTO_BYTES = b"fake image data"
+# Each Dropbox-backed storage call with the endpoint it posts to, for the
+# error tests shared across calls
+STORAGE_CALLS = [
+    pytest.param("list_photos", (), LIST_FOLDER_URL, id="list_photos"),
+    pytest.param("get_photo", ("photo1.jpg",), DOWNLOAD_URL, id="get_photo"),
+    pytest.param("exists", ("photo1.jpg",), GET_METADATA_URL, id="exists"),
+]
+TOKEN_LIFETIME = 14400  # seconds, as Dropbox reports in expires_in
+
+
+def _lookup_error(tag: str) -> dict[str, object]:
+    """A get_metadata 409 body for the LookupError ``tag``."""
+    return {
+        "error_summary": f"path/{tag}/",
+        "error": {".tag": "path", "path": {".tag": tag}},
+    }
+
 
-OAUTH_TOKEN_URL = "https://api.dropbox.com/oauth2/token"  # noqa: S105
+class _DummyPhotoStorage(PhotoStorage):
+    """Concrete PhotoStorage whose methods raise NotImplementedError."""
 
+    def list_photos(self) -> list[str]:
+        msg = "list_photos not implemented"
+        raise NotImplementedError(msg)
 
-@pytest.fixture(autouse=True)
-def dropbox_oauth_env(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setenv("DROPBOX_APP_KEY", "dummy-app-key")
-    monkeypatch.setenv("DROPBOX_APP_SECRET", "dummy-app-secret")
-    monkeypatch.setenv("DROPBOX_REFRESH_TOKEN", "dummy-refresh-token")
+    def get_photo(self, identifier: str) -> bytes:
+        msg = "get_photo not implemented"
+        raise NotImplementedError(msg)
 
 
-def test_storage_interface() -> None:
+def test_storage_interface(dropbox_storage: PhotoStorage) -> None:
     # DropboxStorage must implement the PhotoStorage interface
-    storage: PhotoStorage = DropboxStorage()
-    assert hasattr(storage, "list_photos")
-    assert hasattr(storage, "get_photo")
-    assert callable(storage.list_photos)
-    assert callable(storage.get_photo)
+    assert isinstance(dropbox_storage, DropboxStorage)
+    assert hasattr(dropbox_storage, "list_photos")
+    assert hasattr(dropbox_storage, "get_photo")
+    assert callable(dropbox_storage.list_photos)
+    assert callable(dropbox_storage.get_photo)
 
 
 def test_default_storage_is_dropbox(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -33,318 +117,299 @@ def test_default_storage_is_dropbox(monkeypatch: pytest.MonkeyPatch) -> None:
     assert isinstance(storage, DropboxStorage)
 
 
-def test_dropbox_storage_list_photos() -> None:
-    # Mock Dropbox API response for listing files
-    files_response = {
-        "entries": [
-            {
-                ".tag": "file",
-                "name": "photo1.jpg",
-                "path_display": "/photos/photo1.jpg",
-            },
-            {
-                ".tag": "file",
-                "name": "photo2.png",
-                "path_display": "/photos/photo2.png",
-            },
-            {
-                ".tag": "file",
-                "name": "nested1.JPG",
-                "path_display": "/photos/2024/nested1.JPG",
-            },
-            {
-                ".tag": "file",
-                "name": "nested2.jpeg",
-                "path_display": "/photos/2024/events/nested2.jpeg",
-            },
-            {
-                ".tag": "file",
-                "name": "not_photo.txt",
-                "path_display": "/docs/not_photo.txt",
-            },
-            {
-                ".tag": "folder",
-                "name": "2024",
-                "path_display": "/photos/2024",
-            },
-        ],
-        "has_more": False,
+def test_dropbox_storage_list_photos(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    dbx_mock.post(LIST_FOLDER_URL, json=FILES_RESPONSE)
+    photos = dropbox_storage.list_photos()
+    # Only JPEGs and PNGs, with full relative paths
+    assert set(photos) == {
+        "photos/photo1.jpg",
+        "photos/photo2.png",
+        "photos/2024/nested1.JPG",
+        "photos/2024/events/nested2.jpeg",
     }
 
-    def mock_post(
-        _url: str,
-        _headers: dict[str, str] | None = None,
-        _json: dict[str, str] | None = None,
-        **_kwargs: object,
-    ) -> object:
-        _ = _kwargs
-        if _url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
-
-                def json(self) -> Mapping[str, str]:
-                    return {"access_token": "dummy-token"}
 
-            return MockAuth()
-
-        class MockResponse:
-            def __init__(self) -> None:
-                self.status_code = 200
-
-            def json(self) -> Mapping[str, object]:
-                return files_response
-
-        assert _url.endswith("/files/list_folder")
-        return MockResponse()
-
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        photos = storage.list_photos()
-        # Only JPEGs and PNGs, with full relative paths
-        assert set(photos) == {
-            "photos/photo1.jpg",
-            "photos/photo2.png",
-            "photos/2024/nested1.JPG",
-            "photos/2024/events/nested2.jpeg",
-        }
-
-
-def test_dropbox_storage_get_photo() -> None:
+def test_dropbox_storage_lists_recursively_in_one_request(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # One recursive list_folder call covers every nested folder
+    dbx_mock.post(LIST_FOLDER_URL, json=FILES_RESPONSE)
+    dropbox_storage.list_photos()
+    list_requests = [r for r in dbx_mock.requests if r.url == LIST_FOLDER_URL]
+    assert len(list_requests) == 1
+    sent = list_requests[0].body
+    assert isinstance(sent, bytes)
+    body = loads(sent)
+    assert body["recursive"] is True
+    assert body["include_deleted"] is False
+    assert body["include_non_downloadable_files"] is False
+
+
+def test_dropbox_storage_get_photo(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
     # Mock Dropbox API response for downloading a file
-    photo_bytes = b"fake image data"
-
-    class MockResponse:
-        def __init__(self) -> None:
-            self.status_code = 200
-            self.content = photo_bytes
+    dbx_mock.post(DOWNLOAD_URL, content=PHOTO_BYTES)
+    data = dropbox_storage.get_photo("photo1.jpg")
+    assert data == PHOTO_BYTES
 
-    def mock_post(
-        _url: str,
-        _headers: dict[str, str] | None = None,
-        _data: object | None = None,
-        **_kwargs: object,
-    ) -> object:
-        _ = _kwargs
-        if _url == OAUTH_TOKEN_URL:
 
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
+def test_dropbox_storage_get_photo_decodes_content_encoding(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    dbx_mock.post(
+        DOWNLOAD_URL,
+        content=gzip.compress(PHOTO_BYTES),
+        headers={"Content-Encoding": "gzip"},
+    )
+    assert dropbox_storage.get_photo("photo1.jpg") == PHOTO_BYTES
 
-                def json(self) -> Mapping[str, str]:
-                    return {"access_token": "dummy-token"}
 
-            return MockAuth()
-        assert _url.endswith("/files/download")
-        return MockResponse()
+def test_dropbox_storage_get_photo_body_fails_midway(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    dbx_mock.post(DOWNLOAD_URL, content=PHOTO_BYTES, fail_after=4)
+    with pytest.raises(DropboxStorageError, match=REQUEST_FAILED):
+        dropbox_storage.get_photo("photo1.jpg")
 
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        data = storage.get_photo("photo1.jpg")
-        assert data == photo_bytes
 
-
-def test_dropbox_storage_pagination_api_error() -> None:
-    # Simulate error on pagination (list_folder/continue)
-    page1 = {
+@pytest.mark.usefixtures("dropbox_oauth_env")
+def test_dropbox_storage_get_photos_in_parallel(dbx_mock: DropboxMock) -> None:
+    dbx_mock.post(DOWNLOAD_URL, content=PHOTO_BYTES)
+    storage = DropboxStorage()
+    identifiers = [f"photo{i}.jpg" for i in range(8)]
+    assert storage.get_photos(identifiers, max_workers=4) == [PHOTO_BYTES] * 8
+    # Workers share the token fetched before fanning out
+    assert dbx_mock.calls.count(OAUTH_TOKEN_URL) == 1
+    storage.close()
+
+
+def test_dropbox_storage_iter_photo_streams_chunks(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # Larger than one download chunk, so it must arrive in pieces
+    photo_bytes = bytes(range(256)) * 1024
+    dbx_mock.post(DOWNLOAD_URL, content=photo_bytes)
+    chunks = list(dropbox_storage.iter_photo("big.jpg"))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == photo_bytes
+
+
+def test_dropbox_storage_iter_photo_fails_mid_stream(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # The connection drops once the first chunk has been delivered
+    photo_bytes = bytes(range(256)) * 1024
+    dbx_mock.post(DOWNLOAD_URL, content=photo_bytes, fail_after=DOWNLOAD_CHUNK_SIZE)
+    chunks = dropbox_storage.iter_photo("big.jpg")
+    assert next(chunks) == photo_bytes[:DOWNLOAD_CHUNK_SIZE]
+    with pytest.raises(DropboxStorageError, match=REQUEST_FAILED):
+        next(chunks)
+
+
+def test_dropbox_storage_list_photos_follows_cursor(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    second_page = {
         "entries": [
-            {".tag": "file", "name": "photo1.jpg", "path_display": "/photos/photo1.jpg"}
+            {".tag": "file", "name": "photo2.png", "path_display": "/photos/photo2.png"}
         ],
-        "has_more": True,
-        "cursor": "abc123",
+        "has_more": False,
     }
+    dbx_mock.post(LIST_FOLDER_URL, json=FIRST_PAGE_RESPONSE)
+    dbx_mock.post(LIST_FOLDER_CONTINUE_URL, json=second_page)
+    assert dropbox_storage.list_photos() == ["photos/photo1.jpg", "photos/photo2.png"]
+
+
+def test_dropbox_storage_iter_photos_fetches_pages_lazily(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    dbx_mock.post(LIST_FOLDER_URL, json=FIRST_PAGE_RESPONSE)
+    dbx_mock.post(LIST_FOLDER_CONTINUE_URL, json={"entries": [], "has_more": False})
+    photos = dropbox_storage.iter_photos()
+    assert next(photos) == "photos/photo1.jpg"
+    assert LIST_FOLDER_CONTINUE_URL not in dbx_mock.calls
+    assert list(photos) == []
+    assert LIST_FOLDER_CONTINUE_URL in dbx_mock.calls
+
+
+@pytest.mark.usefixtures("dropbox_oauth_env")
+def test_dropbox_storage_caches_listing_until_invalidated(
+    dbx_mock: DropboxMock,
+) -> None:
+    dbx_mock.post(LIST_FOLDER_URL, json=FILES_RESPONSE)
+    storage = DropboxStorage(list_cache_ttl=60)
+    first = storage.list_photos()
+    first.clear()  # callers get a copy, not the cached list
+    assert storage.list_photos()
+    assert dbx_mock.calls.count(LIST_FOLDER_URL) == 1
+    storage.invalidate_list_cache()
+    storage.list_photos()
+    expected_list_calls = 2
+    assert dbx_mock.calls.count(LIST_FOLDER_URL) == expected_list_calls
+    storage.close()
+
+
+def test_dropbox_storage_list_cache_is_opt_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("DROPBOX_LIST_CACHE_TTL", raising=False)
+    storage = DropboxStorage()
+    assert storage.list_cache_ttl == 0
+    storage.close()
+    monkeypatch.setenv("DROPBOX_LIST_CACHE_TTL", "30")
+    storage = DropboxStorage()
+    expected_ttl = 30
+    assert storage.list_cache_ttl == expected_ttl
+    storage.close()
 
-    def mock_post(
-        url: str,
-        _headers: dict[str, str] | None = None,
-        _json: dict[str, str] | None = None,
-        **_kwargs: object,
-    ) -> object:
-        if url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
-
-                def json(self) -> dict[str, object]:
-                    return {"access_token": "dummy-token"}
-
-            return MockAuth()
-        if url.endswith("/files/list_folder"):
-
-            class MockRespList:
-                status_code = 200
-
-                def json(self) -> Mapping[str, object]:
-                    return page1
-
-            return MockRespList()
-        if url.endswith("/files/list_folder/continue"):
-
-            class MockRespContinue:
-                status_code = 401
-                text = "Unauthorized"
-
-                def json(self) -> Mapping[str, object]:
-                    return {}
-
-            return MockRespContinue()
-        msg = "Unexpected URL"
-        raise AssertionError(msg)
 
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        with pytest.raises(DropboxStorageError, match="Dropbox API error: 401"):
-            storage.list_photos()
+def test_dropbox_storage_pagination_api_error(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # Simulate error on pagination (list_folder/continue)
+    dbx_mock.post(LIST_FOLDER_URL, json=FIRST_PAGE_RESPONSE)
+    dbx_mock.post(LIST_FOLDER_CONTINUE_URL, status_code=401, text="Unauthorized")
+    with pytest.raises(DropboxStorageError, match=API_ERROR_401):
+        dropbox_storage.list_photos()
 
 
 def test_photostorage_abstract_methods() -> None:
-    # Subclass implements but calls super, which raises NotImplementedError
-    class Dummy(PhotoStorage):
-        def list_photos(self) -> list[str]:
-            msg = "list_photos not implemented"
-            raise NotImplementedError(msg)
-
-        def get_photo(self, identifier: str) -> bytes:
-            msg = "get_photo not implemented"
-            raise NotImplementedError(msg)
-
-    dummy = Dummy()
-    with pytest.raises(NotImplementedError):
-        dummy.list_photos()
-    with pytest.raises(NotImplementedError):
-        dummy.get_photo("x")
-
-
-def test_dropbox_storage_list_photos_error() -> None:
-    # Simulate Dropbox API error
-    def mock_post(
-        _url: str,
-        _headers: dict[str, str] | None = None,
-        _json: dict[str, str] | None = None,
-        **_kwargs: object,
-    ) -> object:
-        _ = _kwargs
-        if _url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
+    dummy = _DummyPhotoStorage()
+    for method, args in (("list_photos", ()), ("get_photo", ("x",))):
+        with pytest.raises(NotImplementedError, match=f"{method} not implemented"):
+            getattr(dummy, method)(*args)
+
+
+@pytest.mark.parametrize(("method", "args", "url"), STORAGE_CALLS)
+def test_dropbox_storage_api_error(
+    dbx_mock: DropboxMock,
+    dropbox_storage: DropboxStorage,
+    method: str,
+    args: tuple[str, ...],
+    url: str,
+) -> None:
+    dbx_mock.post(url, status_code=401, text="Unauthorized")
+    with pytest.raises(DropboxStorageError, match=API_ERROR_401):
+        getattr(dropbox_storage, method)(*args)
+
+
+def test_dropbox_storage_get_photo_not_found(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # Simulate Dropbox API file not found
+    dbx_mock.post(DOWNLOAD_URL, status_code=409, text="File not found")
+    with pytest.raises(DropboxStorageError, match=API_ERROR):
+        dropbox_storage.get_photo("missing.jpg")
 
-                def json(self) -> dict[str, object]:
-                    return {"access_token": "dummy-token"}
 
-            return MockAuth()
+def test_dropbox_storage_exists(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    dbx_mock.post(GET_METADATA_URL, json={".tag": "file", "name": "photo1.jpg"})
+    assert dropbox_storage.exists("photo1.jpg") is True
+    sent = dbx_mock.requests[-1].body
+    assert isinstance(sent, bytes)
+    assert loads(sent) == {"path": "/photos/photo1.jpg"}
 
-        class MockResponse:
-            def __init__(self) -> None:
-                self.status_code = 401
-                self.text = "Unauthorized"
 
-            def json(self) -> Mapping[str, object]:
-                return {"error": "Unauthorized"}
+def test_dropbox_storage_exists_not_found(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage
+) -> None:
+    # Dropbox reports a missing path as 409 path/not_found
+    dbx_mock.post(GET_METADATA_URL, status_code=409, json=_lookup_error("not_found"))
+    assert dropbox_storage.exists("missing.jpg") is False
 
-        return MockResponse()
 
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        with pytest.raises(DropboxStorageError, match="Dropbox API error"):
-            storage.list_photos()
+@pytest.mark.parametrize("tag", ["malformed_path", "restricted_content", "locked"])
+def test_dropbox_storage_exists_other_conflict(
+    dbx_mock: DropboxMock, dropbox_storage: DropboxStorage, tag: str
+) -> None:
+    # Only path/not_found means missing; other 409s are real failures
+    dbx_mock.post(GET_METADATA_URL, status_code=409, json=_lookup_error(tag))
+    with pytest.raises(DropboxStorageError, match=API_ERROR):
+        dropbox_storage.exists("photo1.jpg")
 
 
-def test_dropbox_storage_get_photo_not_found() -> None:
-    # Simulate Dropbox API file not found
-    def mock_post(
-        _url: str,
-        _headers: dict[str, str] | None = None,
-        _data: object | None = None,
-        **_kwargs: object,
-    ) -> object:
-        _ = _kwargs
-        if _url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
-
-                def json(self) -> Mapping[str, str]:
-                    return {"access_token": "dummy-token"}
-
-            return MockAuth()
-
-        class MockResponse:
-            def __init__(self) -> None:
-                self.status_code = 409
-                self.text = "File not found"
-
-        return MockResponse()
-
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        with pytest.raises(DropboxStorageError, match="Dropbox API error"):
-            storage.get_photo("missing.jpg")
-
-
-def test_dropbox_storage_missing_token(monkeypatch: pytest.MonkeyPatch) -> None:
-    # remove OAuth credentials to simulate missing config
-    monkeypatch.delenv("DROPBOX_APP_KEY", raising=False)
-    monkeypatch.delenv("DROPBOX_APP_SECRET", raising=False)
-    monkeypatch.delenv("DROPBOX_REFRESH_TOKEN", raising=False)
+@pytest.mark.usefixtures("no_dropbox_env")
+def test_dropbox_storage_missing_token() -> None:
     storage = DropboxStorage()
-    with pytest.raises(
-        DropboxStorageError, match="Dropbox OAuth credentials are not set"
-    ):
+    with pytest.raises(DropboxStorageError, match=MISSING_CREDENTIALS):
         storage.list_photos()
-    with pytest.raises(
-        DropboxStorageError, match="Dropbox OAuth credentials are not set"
-    ):
+    with pytest.raises(DropboxStorageError, match=MISSING_CREDENTIALS):
         storage.get_photo("anything.jpg")
-
-
-def test_dropbox_storage_list_photos_request_exception() -> None:
-    def mock_post(*args: object, **_kwargs: object) -> object:
-        url, *_ = args
-        if url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
-
-                def json(self) -> Mapping[str, str]:
-                    return {"access_token": "dummy-token"}
-
-            return MockAuth()
-        msg = "Simulated connection error"
-        raise requests.RequestException(msg)
-
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        with pytest.raises(DropboxStorageError, match="Dropbox API request failed"):
-            storage.list_photos()
-
-
-def test_dropbox_storage_get_photo_request_exception() -> None:
-    def mock_post(*args: object, **_kwargs: object) -> object:
-        url, *_ = args
-        if url == OAUTH_TOKEN_URL:
-
-            class MockAuth:
-                def __init__(self) -> None:
-                    self.status_code = 200
-
-                def json(self) -> Mapping[str, str]:
-                    return {"access_token": "dummy-token"}
-
-            return MockAuth()
-        msg = "Simulated connection error"
-        raise requests.RequestException(msg)
-
-    with patch("requests.post", mock_post):
-        storage = DropboxStorage()
-        with pytest.raises(DropboxStorageError, match="Dropbox API request failed"):
-            storage.get_photo("anything.jpg")
+    storage.close()
+
+
+@pytest.mark.parametrize(("method", "args", "url"), STORAGE_CALLS)
+def test_dropbox_storage_request_exception(
+    dbx_mock: DropboxMock,
+    dropbox_storage: DropboxStorage,
+    method: str,
+    args: tuple[str, ...],
+    url: str,
+) -> None:
+    dbx_mock.post(url, exc=requests.RequestException("Simulated connection error"))
+    with pytest.raises(DropboxStorageError, match=REQUEST_FAILED):
+        getattr(dropbox_storage, method)(*args)
+
+
+@pytest.mark.usefixtures("dropbox_oauth_env")
+def test_dropbox_storage_reuses_token_until_expiry(
+    dbx_mock: DropboxMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    dbx_mock.post(
+        OAUTH_TOKEN_URL,
+        json={"access_token": "dummy-token", "expires_in": TOKEN_LIFETIME},
+    )
+    dbx_mock.post(DOWNLOAD_URL, content=PHOTO_BYTES)
+    storage = DropboxStorage()
+    storage.get_photo("one.jpg")
+    storage.get_photo("two.jpg")
+    assert dbx_mock.calls.count(OAUTH_TOKEN_URL) == 1
+    assert dbx_mock.requests[-1].headers["Authorization"] == "Bearer dummy-token"
+    # Once the lifetime has passed, the next call fetches a new token
+    dbx_mock.post(
+        OAUTH_TOKEN_URL,
+        json={"access_token": "fresh-token", "expires_in": TOKEN_LIFETIME},
+    )
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + TOKEN_LIFETIME)
+    storage.get_photo("three.jpg")
+    expected_token_calls = 2
+    assert dbx_mock.calls.count(OAUTH_TOKEN_URL) == expected_token_calls
+    assert dbx_mock.requests[-1].headers["Authorization"] == "Bearer fresh-token"
+    storage.close()
+
+
+def test_dropbox_storage_session_retries_transient_errors() -> None:
+    storage = DropboxStorage()
+    adapter = storage.session.adapters["https://"]
+    assert isinstance(adapter, HTTPAdapter)
+    retries = adapter.max_retries
+    assert isinstance(retries.total, int)
+    assert retries.total > 0
+    assert retries.allowed_methods is not None
+    assert "POST" in retries.allowed_methods
+    assert retries.status_forcelist is not None
+    assert HTTPStatus.SERVICE_UNAVAILABLE in retries.status_forcelist
+    storage.close()
+
+
+def test_storage_backend_is_cached_until_reset(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+    storage = get_storage_backend()
+    # A blank override names the same default backend
+    monkeypatch.setenv("STORAGE_BACKEND", "")
+    assert get_storage_backend() is storage
+    closed: list[PhotoStorage] = []
+    monkeypatch.setattr(storage, "close", lambda: closed.append(storage))
+    reset_storage_backend()
+    # Reset releases the old backend's connections before forgetting it
+    assert closed == [storage]
+    assert get_storage_backend() is not storage
 
 
 def test_blank_override_backend_env(monkeypatch: pytest.MonkeyPatch) -> None:
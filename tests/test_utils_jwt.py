@@ -1,8 +1,40 @@
+from collections.abc import Callable, Generator
+
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, status
 
 from app.utils.jwt import create_access_token, decode_access_token, get_secret_key
 
+JWT_SECRET = "testkey"  # noqa: S105
+
+
+@pytest.fixture(scope="module", autouse=True)
+def jwt_secret_env() -> Generator[None, None, None]:
+    """Set the signing key once for the whole module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("JWT_SECRET_KEY", JWT_SECRET)
+        yield
+
+
+@pytest.fixture(scope="module")
+def valid_token() -> str:
+    """One token signed with the module key, for the negative tests to corrupt."""
+    return create_access_token({"sub": "user"})
+
+
+def _not_a_token(_token: str) -> str:
+    return "notatoken"
+
+
+def _tamper_signature(token: str) -> str:
+    signed, signature = token.rsplit(".", 1)
+    forged = "BBBB" if signature.endswith("AAAA") else "AAAA"
+    return f"{signed}.{signature[:-4]}{forged}"
+
+
+def _strip_signature(token: str) -> str:
+    return token.rsplit(".", 1)[0] + "."
+
 
 def test_get_secret_key_missing(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv("JWT_SECRET_KEY", raising=False)
@@ -11,18 +43,16 @@ def test_get_secret_key_missing(monkeypatch: pytest.MonkeyPatch) -> None:
     assert "JWT_SECRET_KEY not set in environment" in str(excinfo.value)
 
 
-def test_create_and_decode_token(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setenv("JWT_SECRET_KEY", "testkey")
-    token = create_access_token({"sub": "user"})
+@pytest.mark.parametrize("claims", [{"sub": "user"}, {"sub": "user", "role": "admin"}])
+def test_create_and_decode_token(claims: dict[str, str]) -> None:
+    token = create_access_token(claims)
     assert isinstance(token, str)
-    claims = decode_access_token(token)
-    assert claims.get("sub") == "user"
+    decoded = decode_access_token(token)
+    assert {name: decoded.get(name) for name in claims} == claims
 
 
-def test_decode_invalid_token(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setenv("JWT_SECRET_KEY", "testkey")
+@pytest.mark.parametrize("corrupt", [_not_a_token, _tamper_signature, _strip_signature])
+def test_decode_invalid_token(valid_token: str, corrupt: Callable[[str], str]) -> None:
     with pytest.raises(HTTPException) as excinfo:
-        decode_access_token("notatoken")
-    from fastapi import status
-
+        decode_access_token(corrupt(valid_token))
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED